@@ -32,6 +32,8 @@ PCR_HOLD = (10, 60)  # Hold at 10°C for 1 minute (for simulation)
 # Simulation Parameters
 TIME_STEP = 0.1  # seconds - Simulation time step
 DOWNSAMPLE_THRESHOLD = 5000  # Maximum points to display on graph
+ADAPTIVE_STEP_FACTOR = 10  # Time steps taken at once while settled (adaptive stepping)
+ADAPTIVE_STEP_TOLERANCE = 0.01  # °C - |error| and |D term| below which the system counts as settled
 
 # Input Validation Ranges
 TEMP_MIN = 0  # °C
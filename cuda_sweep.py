@@ -0,0 +1,78 @@
+"""
+CUDA kernel for PID parameter sweeps (PCRSimulator.simulate_sweep_gpu).
+Imported only when a GPU sweep is requested, so the CPU paths never load numba.cuda.
+"""
+
+from numba import cuda
+
+import pcr_simulator
+
+# The step helpers of the CPU kernels, compiled from the same Python source
+# (py_func of the njit dispatchers) as CUDA device functions
+_thermal_coefficients = cuda.jit(device=True)(pcr_simulator._thermal_coefficients.py_func)
+_thermal_step = cuda.jit(device=True)(pcr_simulator._thermal_step.py_func)
+_pid_step = cuda.jit(device=True)(pcr_simulator._pid_step.py_func)
+
+
+@cuda.jit(fastmath=True)
+def sweep_kernel(
+    setpoint_array,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, stride,
+    out,
+):
+    """
+    One GPU thread per (kp[i], ti[i], td[i]) run, fixed time steps; kp, ti
+    and td are 1-D (PCRSimulator flattens gain grids before the launch).
+
+    The thread body is the fixed-step loop of pcr_simulator._simulate_core
+    around the shared _pid_step / _thermal_step device functions. Every
+    stride-th step is written into out[i], shape (runs, 8, N), rows ordered
+    as _FIELDS. Threads past the last run (the grid is rounded up to whole
+    blocks) return before touching any array.
+    """
+    run = cuda.grid(1)
+    if run >= kp.shape[0]:
+        return
+
+    run_kp = kp[run]
+    run_ti = ti[run]
+    run_td = td[run]
+    integrate = run_ti > 0
+    inv_ti = 1.0 / run_ti if integrate else 0.0
+    inv_dt = 1.0 / dt
+    decay, gain = _thermal_coefficients(1.0 / heat_capacity, heat_loss_coef, dt)
+
+    temperature = initial_temp
+    integral = 0.0
+    prev_error = 0.0
+    prev_derivative = 0.0
+
+    for step in range(setpoint_array.shape[0]):
+        setpoint = setpoint_array[step]
+        current_temp = temperature
+
+        # PID controller
+        error = setpoint - current_temp
+        output_clamped, integral, prev_derivative, p_term, i_term, d_term = _pid_step(
+            error, prev_error, prev_derivative, integral, dt, inv_dt,
+            run_kp, run_ti, inv_ti, run_td, output_min, output_max, integrate,
+        )
+        prev_error = error
+
+        # Thermal model
+        temperature = _thermal_step(temperature, output_clamped, heating_power, cooling_power,
+                                    heat_loss_coef, ambient_temp, decay, gain)
+
+        # Store data (every stride-th step)
+        if step % stride == 0:
+            sample = step // stride
+            out[run, 0, sample] = step * dt
+            out[run, 1, sample] = current_temp
+            out[run, 2, sample] = setpoint
+            out[run, 3, sample] = output_clamped
+            out[run, 4, sample] = error
+            out[run, 5, sample] = p_term
+            out[run, 6, sample] = i_term
+            out[run, 7, sample] = d_term
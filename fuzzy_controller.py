@@ -4,10 +4,129 @@ Fuzzy PD controller
 Trapezoidal membership functions
 MIN T-norm
 MAX aggregation
+Simplified (area-weighted) centroid defuzzification, grid centroid with exact=True
 """
 
 import numpy as np
 
+from numba_compat import njit
+
+# labels of fuzzy sets, rows of the parameter arrays below follow this order
+_E_LABELS = ("NB", "NS", "Z", "PS", "PB")
+_CE_LABELS = ("N", "Z", "P")
+_U_LABELS = ("NB", "NS", "Z", "PS", "PB")
+
+# trapezoid (a, b, c, d) of every error set (like P in PID)
+_E_PARAMS = np.array([
+    [-100.0, -100.0, -60.0, -40.0],
+    [-60.0, -30.0, -15.0, 0.0],
+    [-10.0, -2.0, 2.0, 10.0],
+    [0.0, 15.0, 30.0, 60.0],
+    [40.0, 60.0, 100.0, 100.0],
+])
+
+# trapezoid (a, b, c, d) of every change-of-error set (like D in PID)
+_CE_PARAMS = np.array([
+    [-100.0, -80.0, -40.0, 0.0],
+    [-10.0, -1.0, 1.0, 10.0],
+    [0.0, 40.0, 80.0, 100.0],
+])
+
+# trapezoid (a, b, c, d) of every output set
+_U_PARAMS = np.array([
+    [-1.0, -1.0, -0.8, -0.5],
+    [-0.8, -0.5, -0.2, 0.0],
+    [-0.11, -0.01, 0.01, 0.11],
+    [0.0, 0.2, 0.5, 0.8],
+    [0.5, 0.8, 1.0, 1.0],
+])
+
+# centroid and area of every output trapezoid (simplified centroid method)
+_a, _b, _c, _d = _U_PARAMS.T
+_U_CENTROIDS = ((_c * _c + _c * _d + _d * _d) - (_a * _a + _a * _b + _b * _b)) / (3.0 * ((_c + _d) - (_a + _b)))
+_U_AREAS = ((_d - _a) + (_c - _b)) / 2.0
+del _a, _b, _c, _d
+
+# rules of controller (if fuzzify_error is "PB" and fuzzify_ce is "P" take output values from "PB")
+_RULES = (
+    ("PB", "P", "PB"),
+    ("PB", "Z", "PB"),
+    ("PB", "N", "PS"),
+
+    ("PS", "P", "PB"),
+    ("PS", "Z", "PS"),
+    ("PS", "N", "Z"),
+
+    ("Z",  "P", "PS"),
+    ("Z",  "Z", "Z"),
+    ("Z",  "N", "NS"),
+
+    ("NS", "P", "Z"),
+    ("NS", "Z", "NS"),
+    ("NS", "N", "NB"),
+
+    ("NB", "P", "NS"),
+    ("NB", "Z", "NB"),
+    ("NB", "N", "NB"),
+)
+
+# rules as row indices into the error, ce and output parameter arrays
+_R_E = np.array([_E_LABELS.index(e) for e, _, _ in _RULES], dtype=np.int8)
+_R_CE = np.array([_CE_LABELS.index(ce) for _, ce, _ in _RULES], dtype=np.int8)
+_R_U = np.array([_U_LABELS.index(u) for _, _, u in _RULES], dtype=np.int8)
+
+# the same tables as plain-float tuples for _fuzzy_step (numba reads them as constants,
+# without numba the step then does Python float math instead of numpy scalar ops)
+_E_ROWS = tuple(map(tuple, _E_PARAMS.tolist()))
+_CE_ROWS = tuple(map(tuple, _CE_PARAMS.tolist()))
+_RULE_ROWS = tuple(zip(_R_E.tolist(), _R_CE.tolist(), _R_U.tolist()))
+_U_WEIGHTS = tuple(zip(_U_AREAS.tolist(), _U_CENTROIDS.tolist()))
+
+
+# memberships of x in every trapezoid row (a, b, c, d) of abcd at once
+def _memberships(x, abcd):
+    a, b, c, d = abcd.T
+    left = np.where(b == a, 1.0, (x - a) / (b - a + 1e-30))
+    right = np.where(d == c, 1.0, (d - x) / (d - c + 1e-30))
+    return np.clip(np.minimum(left, right), 0.0, 1.0)
+
+
+# branchless membership function for the compiled kernel
+@njit('float64(float64, float64, float64, float64, float64)', cache=True, fastmath=True)
+def _trapmf(x, a, b, c, d):
+    left = 1.0 if b == a else (x - a) / (b - a)
+    right = 1.0 if d == c else (d - x) / (d - c)
+    return max(0.0, min(left, 1.0, right))
+
+
+# whole fuzzy step: fuzzify, MIN/MAX rules, simplified centroid -> normalized output
+# u = sum(alpha_k * A_k * c_k) / sum(alpha_k * A_k)
+@njit('float64(float64, float64)', cache=True, fastmath=True, boundscheck=False)
+def _fuzzy_step(e, ce):
+    e_mf = (
+        _trapmf(e, *_E_ROWS[0]), _trapmf(e, *_E_ROWS[1]), _trapmf(e, *_E_ROWS[2]),
+        _trapmf(e, *_E_ROWS[3]), _trapmf(e, *_E_ROWS[4]),
+    )
+    ce_mf = (_trapmf(ce, *_CE_ROWS[0]), _trapmf(ce, *_CE_ROWS[1]), _trapmf(ce, *_CE_ROWS[2]))
+
+    alpha = np.zeros(5)
+    for e_label, ce_label, u_label in _RULE_ROWS:
+        activation = min(e_mf[e_label], ce_mf[ce_label])   # T-norm MIN
+        alpha[u_label] = max(alpha[u_label], activation)    # S-norm MAX
+
+    num = 0.0
+    den = 0.0
+    for k in range(5):
+        area, centroid = _U_WEIGHTS[k]
+        weight = alpha[k] * area
+        num += weight * centroid
+        den += weight
+
+    if den == 0.0:
+        return 0.0
+
+    return num / den
+
 class FuzzyController:
 
     # preparation of controller
@@ -20,14 +139,34 @@ class FuzzyController:
         universe_step: float = 0.01,
         param1: float = 0.5,  # Default value for param1
         param2: float = 1.0,  # Default value for param2
+        exact: bool = False,  # grid-based max aggregation + centroid (for validation)
     ):
         self.output_min = output_min
         self.output_max = output_max
 
-        self.u_universe = np.arange(universe_min, universe_max, universe_step)
+        self.u_universe = np.linspace(
+            universe_min,
+            universe_max,
+            num=int(round((universe_max - universe_min) / universe_step)),
+            endpoint=False,
+            dtype=np.float32,
+        )
+
+        # output membership functions sampled once over the universe, shape (5, N)
+        self._out_mf = np.stack([
+            self.trapmf_vec(self.u_universe, *params)
+            for params in _U_PARAMS.tolist()
+        ])
+
+        self.exact = exact
 
         self.prev_error = 0.0
 
+        # no P/I/D components, zeros read like PIDController's terms
+        self.p_term = 0.0
+        self.i_term = 0.0
+        self.d_term = 0.0
+
         # Initialize new parameters
         self.param1 = param1
         self.param2 = param2
@@ -36,110 +175,69 @@ class FuzzyController:
     def reset(self):
         self.prev_error = 0.0
 
-    # implement zeros for p, i, and d (for )
+    # implement zeros for p, i, and d
     def get_components(self):
         return 0.0, 0.0, 0.0
 
-    # membership function
+    # implement zeros for p, i, and d (written in place, like PIDController)
+    def fill_components(self, p_array, i_array, d_array, step):
+        p_array[step] = 0.0
+        i_array[step] = 0.0
+        d_array[step] = 0.0
+
+    # membership function (branchless, b == a / d == c are shoulders)
     @staticmethod
     def trapmf(x, a, b, c, d):
-        if x <= a or x >= d:
-            return 0.0
-        elif b <= x <= c:
-            return 1.0
-        elif a < x < b:
-            return (x - a) / (b - a)
-        else:
-            return (d - x) / (d - c)
+        left = 1.0 if b == a else (x - a) / (b - a)
+        right = 1.0 if d == c else (d - x) / (d - c)
+        return max(0.0, min(left, 1.0, right))
+
+    # membership function evaluated over a whole array (b == a / d == c are shoulders)
+    @staticmethod
+    def trapmf_vec(x, a, b, c, d):
+        left = np.ones_like(x) if b == a else (x - a) / (b - a)
+        right = np.ones_like(x) if d == c else (d - x) / (d - c)
+        return np.clip(np.minimum(left, right), 0.0, 1.0)
 
-    # define fuzzify intervals (like P in PID)
+    # define fuzzify intervals (like P in PID), memberships ordered as _E_LABELS
     def fuzzify_error(self, e):
-        return {
-            "NB": self.trapmf(e, -100, -100, -60, -40),
-            "NS": self.trapmf(e, -60, -30, -15, 0),
-            "Z":  self.trapmf(e, -10, -2, 2, 10),
-            "PS": self.trapmf(e, 0, 15, 30, 60),
-            "PB": self.trapmf(e, 40, 60, 100, 100),
-        }
-
-    # fuzzify direction of changes (like D in PID)
+        return _memberships(e, _E_PARAMS)
+
+    # fuzzify direction of changes (like D in PID), memberships ordered as _CE_LABELS
     def fuzzify_ce(self, ce):
-        return {
-            "N": self.trapmf(ce, -100, -80, -40, 0),
-            "Z": self.trapmf(ce, -10, -1, 1, 10),
-            "P": self.trapmf(ce, 0, 40, 80, 100),
-        }
+        return _memberships(ce, _CE_PARAMS)
 
-    # output values
+    # output values, memberships ordered as _U_LABELS
     def output_sets(self, u):
-        return {
-            "NB": self.trapmf(u, -1.0, -1.0, -0.8, -0.5),
-            "NS": self.trapmf(u, -0.8, -0.5, -0.2, 0.0),
-            "Z":  self.trapmf(u, -0.11, -0.01, 0.01, 0.11),
-            "PS": self.trapmf(u, 0.0, 0.2, 0.5, 0.8),
-            "PB": self.trapmf(u, 0.5, 0.8, 1.0, 1.0),
-        }
-
-    # rules of controller (if fuzzify_error is "PB" and fuzzify_ce is "P" take output values from "PB")
-    def rules(self, e, ce):
-        return [
-            ("PB", "P", "PB"),
-            ("PB", "Z", "PB"),
-            ("PB", "N", "PS"),
-
-            ("PS", "P", "PB"),
-            ("PS", "Z", "PS"),
-            ("PS", "N", "Z"),
-
-            ("Z",  "P", "PS"),
-            ("Z",  "Z", "Z"),
-            ("Z",  "N", "NS"),
-
-            ("NS", "P", "Z"),
-            ("NS", "Z", "NS"),
-            ("NS", "N", "NB"),
-
-            ("NB", "P", "NS"),
-            ("NB", "Z", "NB"),
-            ("NB", "N", "NB"),
-        ]
+        return _memberships(u, _U_PARAMS)
 
     # making decision from rules
     def infer(self, e_sets, ce_sets):
-        aggregated = np.zeros_like(self.u_universe)
-
-        for e_label, ce_label, u_label in self.rules(e_sets, ce_sets):
-            activation = min(e_sets[e_label], ce_sets[ce_label])    # T-norm MIN
-
-            if activation == 0:
-                continue
+        activation = np.minimum(e_sets[_R_E], ce_sets[_R_CE])    # T-norm MIN
+        activation = activation.astype(self._out_mf.dtype)
 
-            u_mf = np.array([
-                min(activation, self.output_sets(u)[u_label])
-                for u in self.u_universe
-            ])
-
-            aggregated = np.maximum(aggregated, u_mf)   # S-norm MAX
-
-        return aggregated
+        # clip every rule's output set, S-norm MAX over rules
+        return np.minimum(activation[:, None], self._out_mf[_R_U]).max(axis=0)
 
     # one, number output from fuzzy rules
     def defuzzify(self, aggregated):
         if np.sum(aggregated) == 0:
             return 0.0
 
-        return np.sum(self.u_universe * aggregated) / np.sum(aggregated)
+        return float(np.sum(self.u_universe * aggregated) / np.sum(aggregated))
 
     # control cycle
     def update(self, setpoint: float, measurement: float, dt: float) -> float:
         error = setpoint - measurement
         ce = (error - self.prev_error) / dt if dt > 0 else 0.0
 
-        e_sets = self.fuzzify_error(error)
-        ce_sets = self.fuzzify_ce(ce)
-
-        aggregated = self.infer(e_sets, ce_sets)
-        u_norm = self.defuzzify(aggregated)
+        if self.exact:
+            e_sets = self.fuzzify_error(error)
+            ce_sets = self.fuzzify_ce(ce)
+            aggregated = self.infer(e_sets, ce_sets)
+            u_norm = self.defuzzify(aggregated)
+        else:
+            u_norm = _fuzzy_step(error, ce)
 
         # powe scalling
         u = u_norm * self.output_max
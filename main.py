@@ -3,16 +3,18 @@ PCR Thermocycler Simulation Dashboard
 Interactive web application for simulating PCR thermocycler with PID control.
 """
 
+import copy
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from fuzzy_controller import FuzzyController
 
-from thermal_model import ThermalModel
-from pid_controller import PIDController
-from pcr_simulator import PCRSimulator
 import config
 
 
@@ -21,6 +23,68 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "PCR Thermocycler Simulator"
 
 
+@functools.lru_cache(maxsize=8)
+def _fuzzy_template(param1, param2, output_min, output_max):
+    """Build (once per parameter set) a FuzzyController with its precomputed sets."""
+    from fuzzy_controller import FuzzyController
+
+    return FuzzyController(
+        param1=param1,
+        param2=param2,
+        output_min=output_min,
+        output_max=output_max,
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _simulate(controller, thermal_params, controller_params, protocol):
+    """
+    Run one PCR simulation, cached on every input.
+
+    Args:
+        controller: 'pid' or 'fuzzy'
+        thermal_params: ThermalModel keyword arguments as (name, value) pairs
+        controller_params: Controller keyword arguments as (name, value) pairs
+        protocol: PCRSimulator.simulate keyword arguments as (name, value) pairs
+
+    Returns:
+        Results dict of PCRSimulator.simulate, with read-only arrays
+        because the same dict is handed to every caller with these inputs
+    """
+    # Simulation modules are imported on first run, not at server start-up
+    from thermal_model import ThermalModel
+    from pid_controller import PIDController
+    from pcr_simulator import PCRSimulator
+
+    # Thermal model and controller are stateful, so fresh ones for every run
+    thermal_model = ThermalModel(**dict(thermal_params))
+    if controller == 'pid':
+        control = PIDController(**dict(controller_params))
+    else:
+        control = _make_fuzzy(**dict(controller_params))
+
+    results = PCRSimulator(thermal_model, control).simulate(**dict(protocol))
+    for array in results.values():
+        array.flags.writeable = False
+    return results
+
+
+def _step_points(x, y):
+    """Reduce a piecewise-constant series to the samples where its value changes."""
+    if len(y) == 0:
+        return x[:0], y[:0]
+    changes = np.flatnonzero(np.diff(y)) + 1
+    indices = np.concatenate(([0], changes, [len(y) - 1]))
+    return x[indices], y[indices]
+
+
+def _make_fuzzy(param1, param2, output_min, output_max):
+    """Return a fresh FuzzyController sharing the cached template's read-only arrays."""
+    controller = copy.copy(_fuzzy_template(param1, param2, output_min, output_max))
+    controller.reset()
+    return controller
+
+
 # Layout
 app.layout = dbc.Container([
     # Header
@@ -403,6 +467,35 @@ app.layout = dbc.Container([
 ], fluid=True)
 
 
+# Callback inputs that must be filled in before simulating
+_REQUIRED = (
+    'heat_capacity',
+    'heating_power',
+    'cooling_power',
+    'heat_loss',
+    'ambient_temp',
+    'pid_kp',
+    'pid_ti',
+    'pid_td',
+    'fuzzy_param_1',
+    'fuzzy_param_2',
+    'sample_volume',
+    'sample_density',
+    'sample_specific_heat',
+    'initial_temp',
+    'initial_duration',
+    'denat_temp',
+    'denat_duration',
+    'anneal_temp',
+    'anneal_duration',
+    'extension_temp',
+    'extension_duration',
+    'num_cycles',
+    'final_temp',
+    'final_duration',
+)
+
+
 # Callback for simulation
 @app.callback(
     Output("results-graph", "figure"),
@@ -461,37 +554,9 @@ def run_simulation(
     final_duration,
 ):
     """Run PCR simulation and generate results plot."""
-    
     # Validate all inputs are not None
-    required_params = {
-        'heat_capacity': heat_capacity,
-        'heating_power': heating_power,
-        'cooling_power': cooling_power,
-        'heat_loss': heat_loss,
-        'ambient_temp': ambient_temp,
-        'pid_kp': pid_kp,
-        'pid_ti': pid_ti,
-        'pid_td': pid_td,
-        'fuzzy_param_1': fuzzy_param_1,
-        'fuzzy_param_2': fuzzy_param_2,
-        'sample_volume': sample_volume,
-        'sample_density': sample_density,
-        'sample_specific_heat': sample_specific_heat,
-        'initial_temp': initial_temp,
-        'initial_duration': initial_duration,
-        'denat_temp': denat_temp,
-        'denat_duration': denat_duration,
-        'anneal_temp': anneal_temp,
-        'anneal_duration': anneal_duration,
-        'extension_temp': extension_temp,
-        'extension_duration': extension_duration,
-        'num_cycles': num_cycles,
-        'final_temp': final_temp,
-        'final_duration': final_duration,
-    }
-    
-    # Check for None values
-    missing = [name for name, value in required_params.items() if value is None]
+    values = locals()
+    missing = [name for name in _REQUIRED if values[name] is None]
     if missing:
         # Return empty figure with error message
         fig = go.Figure()
@@ -503,68 +568,53 @@ def run_simulation(
         )
         return fig
     
-    # Create thermal model
-    thermal_model = ThermalModel(
-        heat_capacity=heat_capacity,
-        heating_power=heating_power,
-        cooling_power=cooling_power,
-        heat_loss_coef=heat_loss,
-        ambient_temp=ambient_temp,
-        sample_volume=sample_volume * 1e-6,  # Convert mL to m³
-        sample_density=sample_density,
-        sample_specific_heat=sample_specific_heat,
-        initial_temp=ambient_temp,
+    # Parameters as hashable tuples, so identical runs come from the cache
+    thermal_params = (
+        ('heat_capacity', heat_capacity),
+        ('heating_power', heating_power),
+        ('cooling_power', cooling_power),
+        ('heat_loss_coef', heat_loss),
+        ('ambient_temp', ambient_temp),
+        ('sample_volume', sample_volume * 1e-6),  # Convert mL to m³
+        ('sample_density', sample_density),
+        ('sample_specific_heat', sample_specific_heat),
+        ('initial_temp', ambient_temp),
     )
-    
-    # Create controllers
-    pid_controller = PIDController(
-        kp=pid_kp,
-        ti=pid_ti,
-        td=pid_td,
-        output_min=-cooling_power,
-        output_max=heating_power,
+    pid_params = (
+        ('kp', pid_kp),
+        ('ti', pid_ti),
+        ('td', pid_td),
+        ('output_min', -cooling_power),
+        ('output_max', heating_power),
     )
-
-    fuzzy_controller = FuzzyController(
-        param1=fuzzy_param_1,
-        param2=fuzzy_param_2,
-        output_min=-cooling_power,
-        output_max=heating_power,
+    fuzzy_params = (
+        ('param1', fuzzy_param_1),
+        ('param2', fuzzy_param_2),
+        ('output_min', -cooling_power),
+        ('output_max', heating_power),
     )
-
-    # Run simulations for both controllers
-    pid_simulator = PCRSimulator(thermal_model, pid_controller)
-    fuzzy_simulator = PCRSimulator(thermal_model, fuzzy_controller)
-
-    pid_results = pid_simulator.simulate(
-        initial_temp=initial_temp,
-        initial_duration=initial_duration,
-        denat_temp=denat_temp,
-        denat_duration=denat_duration,
-        anneal_temp=anneal_temp,
-        anneal_duration=anneal_duration,
-        extension_temp=extension_temp,
-        extension_duration=extension_duration,
-        num_cycles=num_cycles,
-        final_temp=final_temp,
-        final_duration=final_duration,
+    protocol = (
+        ('initial_temp', initial_temp),
+        ('initial_duration', initial_duration),
+        ('denat_temp', denat_temp),
+        ('denat_duration', denat_duration),
+        ('anneal_temp', anneal_temp),
+        ('anneal_duration', anneal_duration),
+        ('extension_temp', extension_temp),
+        ('extension_duration', extension_duration),
+        ('num_cycles', num_cycles),
+        ('final_temp', final_temp),
+        ('final_duration', final_duration),
     )
 
-    fuzzy_results = fuzzy_simulator.simulate(
-        initial_temp=initial_temp,
-        initial_duration=initial_duration,
-        denat_temp=denat_temp,
-        denat_duration=denat_duration,
-        anneal_temp=anneal_temp,
-        anneal_duration=anneal_duration,
-        extension_temp=extension_temp,
-        extension_duration=extension_duration,
-        num_cycles=num_cycles,
-        final_temp=final_temp,
-        final_duration=final_duration,
-    )
+    # Run simulations for both controllers (independent, so concurrently)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pid_future = executor.submit(_simulate, 'pid', thermal_params, pid_params, protocol)
+        fuzzy_future = executor.submit(_simulate, 'fuzzy', thermal_params, fuzzy_params, protocol)
+        pid_results = pid_future.result()
+        fuzzy_results = fuzzy_future.result()
 
-    # Create subplots
+    # Create subplots (layout only, traces are attached as plain dicts below)
     fig = make_subplots(
         rows=2, cols=1,
         subplot_titles=(
@@ -575,81 +625,89 @@ def run_simulation(
         horizontal_spacing=0.10,
     )
 
-    # Temperature plot
-    fig.add_trace(
-        go.Scatter(
+    # Update axes labels
+    fig.update_xaxes(title_text="Time (s)", row=1, col=1)
+    fig.update_xaxes(title_text="Time (s)", row=2, col=1)
+
+    fig.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
+    fig.update_yaxes(title_text="Power (W)", row=2, col=1)
+
+    # Update layout (constant uirevision keeps zoom/legend state across runs)
+    fig.update_layout(
+        title_text="PCR Simulation Results",
+        showlegend=True,
+        hovermode='x unified',
+        height=800,
+        uirevision='results',
+    )
+
+    # Setpoint only changes at stage boundaries, send just those points
+    setpoint_time, setpoint = _step_points(pid_results['time'], pid_results['setpoint'])
+
+    # Traces as plain dicts: plotly skips validating and copying the large arrays
+    figure = fig.to_dict()
+    figure['data'] = [
+        # Temperature plot (long time series use the WebGL renderer)
+        dict(
+            type='scattergl',
             x=pid_results['time'],
             y=pid_results['temperature'],
             mode='lines',
             name='PID Temperature',
             line=dict(color='green'),
+            xaxis='x', yaxis='y',
         ),
-        row=1, col=1
-    )
-    fig.add_trace(
-        go.Scatter(
+        dict(
+            type='scattergl',
             x=fuzzy_results['time'],
             y=fuzzy_results['temperature'],
             mode='lines',
             name='Fuzzy Temperature',
             line=dict(color='blue'),
+            xaxis='x', yaxis='y',
         ),
-        row=1, col=1
-    )
-    fig.add_trace(
-        go.Scatter(
-            x=pid_results['time'],
-            y=pid_results['setpoint'],
+        dict(
+            type='scatter',
+            x=setpoint_time,
+            y=setpoint,
             mode='lines',
             name='Setpoint',
-            line=dict(color='red', dash='dash'),
+            line=dict(color='red', dash='dash', shape='hv'),
+            xaxis='x', yaxis='y',
         ),
-        row=1, col=1
-    )
 
-    # Power balance plot
-    fig.add_trace(
-        go.Scatter(
+        # Power balance plot
+        dict(
+            type='scattergl',
             x=pid_results['time'],
             y=pid_results['control'],
             mode='lines',
             name='PID Power Balance',
             line=dict(color='green'),
+            xaxis='x2', yaxis='y2',
         ),
-        row=2, col=1
-    )
-    fig.add_trace(
-        go.Scatter(
+        dict(
+            type='scattergl',
             x=fuzzy_results['time'],
             y=fuzzy_results['control'],
             mode='lines',
             name='Fuzzy Power Balance',
             line=dict(color='blue'),
+            xaxis='x2', yaxis='y2',
         ),
-        row=2, col=1
-    )
-
-    # Update axes labels
-    fig.update_xaxes(title_text="Time (s)", row=1, col=1)
-    fig.update_xaxes(title_text="Time (s)", row=2, col=1)
-
-    fig.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
-    fig.update_yaxes(title_text="Power (W)", row=2, col=1)
-
-    # Update layout
-    fig.update_layout(
-        title_text="PCR Simulation Results",
-        showlegend=True,
-        hovermode='x unified',
-        height=800,
-    )
+    ]
     
-    return fig
+    return figure
 
 
 def main():
-    """Run the Dash application."""
-    app.run(debug=True, host='127.0.0.1', port=8050)
+    """
+    Run the Dash application.
+
+    Debug mode (reloader, dev tools, prop validation) is off by default;
+    start with PID_DEBUG=1 python main.py to enable it.
+    """
+    app.run(debug=os.getenv("PID_DEBUG") == "1", host='127.0.0.1', port=8050)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,15 @@
+"""
+numba entry points shared by the compiled kernels.
+Without numba the kernels run as plain Python: njit leaves functions
+undecorated and prange is range.
+"""
+
+try:
+    from numba import njit, prange
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    prange = range
@@ -3,12 +3,540 @@ PCR simulator combining thermal model and PID controller.
 Simulates complete PCR protocol with simplified interface.
 """
 
+import math
+
 import numpy as np
-from typing import Optional
 
 from thermal_model import ThermalModel
 from pid_controller import PIDController
-from config import TIME_STEP, DOWNSAMPLE_THRESHOLD
+from fuzzy_controller import FuzzyController, _fuzzy_step
+from numba_compat import njit, prange
+from config import TIME_STEP, DOWNSAMPLE_THRESHOLD, ADAPTIVE_STEP_FACTOR, ADAPTIVE_STEP_TOLERANCE
+
+# Result fields, in the row order of the simulation output array
+_FIELDS = ('time', 'temperature', 'setpoint', 'control', 'error', 'p_term', 'i_term', 'd_term')
+
+# Eager (argument-only) signatures of the kernels behind simulate() and simulate_fast():
+# they are compiled, or loaded from the on-disk cache, at import instead of on first use.
+# _simulate_batch_core stays lazy, compiling it would start numba's parallel threading
+# layer on every import. The serial kernels release the GIL (nogil), every call owns its
+# out array, so main.run_simulation's PID and fuzzy threads really run side by side.
+# _simulate_fuzzy_core is not cached: it bakes in fuzzy_controller's rule tables, and
+# numba's cache only tracks this file, so edits there would load a stale kernel.
+_PID_SIGNATURE = (
+    '(float64[::1], int64[::1], float64, float64, float64, float64, float64, '
+    'float64, float64, float64, float64, float64, '
+    'float64, float64, int64, float64, int64, float32[:, ::1])'
+)
+_FUZZY_SIGNATURE = (
+    '(float64[::1], int64[::1], float64, float64, '
+    'float64, float64, float64, float64, float64, '
+    'float64, float64, int64, float64, int64, float32[:, ::1])'
+)
+_FAST_SIGNATURE = (
+    '(float64[::1], int64[::1], int64[::1], float64, float64, float64, float64, float64, '
+    'float64, float64, float64, float64, float64, '
+    'float64, float64, float64, float32[:, ::1])'
+)
+
+
+@njit(inline='always')
+def _thermal_coefficients(inv_heat_capacity, heat_loss_coef, dt):
+    """
+    Decay and gain of the exact thermal step over dt (see ThermalModel.update).
+    
+    Returns:
+        Tuple of (decay, gain)
+    """
+    decay = math.exp(-heat_loss_coef * dt * inv_heat_capacity)
+    if heat_loss_coef > 0:
+        gain = (1.0 - decay) / heat_loss_coef
+    else:
+        gain = dt * inv_heat_capacity
+    return decay, gain
+
+
+@njit(inline='always')
+def _thermal_step(temperature, control_output, heating_power, cooling_power,
+                  heat_loss_coef, ambient_temp, decay, gain):
+    """
+    Advance the temperature by one step (see ThermalModel.update).
+    
+    Returns:
+        New temperature (°C)
+    """
+    if control_output > 0:
+        applied_power = min(control_output, heating_power)
+    else:
+        applied_power = max(control_output, -cooling_power)
+    return temperature * decay + (heat_loss_coef * ambient_temp + applied_power) * gain
+
+
+@njit(inline='always')
+def _pid_step(error, prev_error, prev_derivative, integral, step_dt, inv_step_dt,
+              kp, ti, inv_ti, td, output_min, output_max, integrate):
+    """
+    One PID update on plain floats (see PIDController.update): integral,
+    filtered derivative, clamp and back-calculation anti-windup. The I term
+    and anti-windup are only active with integrate (ti > 0).
+    
+    Returns:
+        Tuple of (output_clamped, integral, filtered_derivative,
+        p_term, i_term, d_term)
+    """
+    p_term = error
+    integral += error * step_dt
+    if integrate:
+        i_term = integral * inv_ti
+    else:
+        i_term = 0.0
+    derivative = (error - prev_error) * inv_step_dt
+    filtered_derivative = 0.5 * derivative + 0.5 * prev_derivative
+    d_term = td * filtered_derivative
+    output = kp * (p_term + i_term + d_term)
+    output_clamped = min(max(output, output_min), output_max)
+    saturated = output_clamped != output
+    if integrate and saturated:
+        max_i_term = (output_clamped / kp) - p_term - d_term
+        integral = max_i_term * ti
+        i_term = max_i_term
+    return output_clamped, integral, filtered_derivative, p_term, i_term, d_term
+
+
+@njit(inline='always')
+def _step_skip(run_ends, step, run, max_skip, settled):
+    """
+    Number of steps to take at once: max_skip while settled inside a
+    constant-setpoint run, otherwise 1.
+    
+    Returns:
+        Tuple of (skip, index of the current constant-setpoint run in run_ends)
+    """
+    skip = 1
+    if max_skip > 1 and settled:
+        while run_ends[run] <= step:
+            run += 1
+        if step + max_skip <= run_ends[run]:
+            skip = max_skip
+    return skip, run
+
+
+@njit(inline='always')
+def _pid_control_ti(error, state, step_dt, inv_step_dt, gains, output_min, output_max):
+    """
+    PID controller step for _simulate_core, I term and anti-windup active.
+    
+    gains is (kp, ti, 1 / ti, td), state is (integral, prev_error, prev_derivative).
+    
+    Returns:
+        Tuple of (output_clamped, new state, p_term, i_term, d_term)
+    """
+    integral, prev_error, prev_derivative = state
+    kp, ti, inv_ti, td = gains
+    output_clamped, integral, prev_derivative, p_term, i_term, d_term = _pid_step(
+        error, prev_error, prev_derivative, integral, step_dt, inv_step_dt,
+        kp, ti, inv_ti, td, output_min, output_max, True,
+    )
+    return output_clamped, (integral, error, prev_derivative), p_term, i_term, d_term
+
+
+@njit(inline='always')
+def _pid_control_noti(error, state, step_dt, inv_step_dt, gains, output_min, output_max):
+    """_pid_control_ti with the I term disabled (ti <= 0)."""
+    integral, prev_error, prev_derivative = state
+    kp, ti, inv_ti, td = gains
+    output_clamped, integral, prev_derivative, p_term, i_term, d_term = _pid_step(
+        error, prev_error, prev_derivative, integral, step_dt, inv_step_dt,
+        kp, ti, inv_ti, td, output_min, output_max, False,
+    )
+    return output_clamped, (integral, error, prev_derivative), p_term, i_term, d_term
+
+
+@njit(inline='always')
+def _fuzzy_control(error, state, step_dt, inv_step_dt, gains, output_min, output_max):
+    """
+    Fuzzy controller step for _simulate_core (see FuzzyController.update,
+    simplified centroid). gains is empty, state is (prev_error,).
+    
+    Returns:
+        Tuple of (output_clamped, new state, and zero p_term, i_term, d_term)
+    """
+    prev_error = state[0]
+    ce = (error - prev_error) * inv_step_dt
+    output = _fuzzy_step(error, ce) * output_max
+    output_clamped = min(max(output, output_min), output_max)
+    return output_clamped, (error,), 0.0, 0.0, 0.0
+
+
+@njit(inline='always')
+def _simulate_core(
+    setpoint_array, run_ends,
+    control, gains, state, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, max_skip, tolerance, stride,
+    out,
+):
+    """
+    Compiled controller + thermal model loop, equivalent to PCRSimulator's
+    object loop.
+    
+    control is one of the controller steps above (_pid_control_ti,
+    _pid_control_noti, _fuzzy_control) with its gains and initial state;
+    every compiled entry point passes a fixed one, so the step is inlined
+    and e.g. the PID I term branches are resolved at compile time.
+    
+    The controller and ThermalModel.update are fused into one loop body on
+    plain floats (the helpers above are inlined), so controller and thermal
+    state never leave registers between steps. Results of every stride-th
+    step are written into the columns of the preallocated (8, N) out array,
+    rows ordered as _FIELDS. All arithmetic is float64, values are only
+    rounded when stored into the (float32) out array. Each entry of
+    setpoint_array is one time step; while holding at the setpoint
+    (|error| and |D| below tolerance) max_skip entries are taken at once,
+    within the constant-setpoint runs ending at run_ends.
+    
+    Returns:
+        Tuple of (samples written, and final temperature, controller state,
+        p_term, i_term, d_term)
+    """
+    # Loop invariants (dt > 0 is checked by PCRSimulator), no divisions in the loop
+    inv_dt = 1.0 / dt
+    skip_inv_dt = inv_dt / max_skip
+    inv_heat_capacity = 1.0 / heat_capacity
+    decay, gain = _thermal_coefficients(inv_heat_capacity, heat_loss_coef, dt)
+    skip_decay, skip_gain = _thermal_coefficients(inv_heat_capacity, heat_loss_coef, max_skip * dt)
+    
+    temperature = initial_temp
+    p_term = 0.0
+    i_term = 0.0
+    d_term = 0.0
+    
+    num_steps = setpoint_array.shape[0]
+    run = 0
+    step = 0
+    sample = 0
+    next_sample = 0
+    
+    while step < num_steps:
+        setpoint = setpoint_array[step]
+        current_temp = temperature
+        
+        settled = abs(setpoint - current_temp) < tolerance and abs(d_term) < tolerance
+        skip, run = _step_skip(run_ends, step, run, max_skip, settled)
+        step_dt = skip * dt
+        inv_step_dt = inv_dt if skip == 1 else skip_inv_dt
+        
+        # Controller
+        error = setpoint - current_temp
+        output_clamped, state, p_term, i_term, d_term = control(
+            error, state, step_dt, inv_step_dt, gains, output_min, output_max,
+        )
+        
+        # Thermal model
+        if skip == 1:
+            temperature = _thermal_step(temperature, output_clamped, heating_power, cooling_power,
+                                        heat_loss_coef, ambient_temp, decay, gain)
+        else:
+            temperature = _thermal_step(temperature, output_clamped, heating_power, cooling_power,
+                                        heat_loss_coef, ambient_temp, skip_decay, skip_gain)
+        
+        # Store data (first step taken in every stride)
+        if step >= next_sample:
+            out[0, sample] = step * dt
+            out[1, sample] = current_temp
+            out[2, sample] = setpoint
+            out[3, sample] = output_clamped
+            out[4, sample] = error
+            out[5, sample] = p_term
+            out[6, sample] = i_term
+            out[7, sample] = d_term
+            sample += 1
+            next_sample = (step // stride + 1) * stride
+        
+        step += skip
+    
+    return sample, temperature, state, p_term, i_term, d_term
+
+
+@njit(_PID_SIGNATURE, cache=True, nogil=True, fastmath=True, boundscheck=False)
+def _simulate_core_ti(
+    setpoint_array, run_ends,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, max_skip, tolerance, stride,
+    out,
+):
+    """
+    _simulate_core with the PID controller, ti > 0 (I term and anti-windup active).
+    
+    Returns:
+        Tuple of (samples written, and final temperature, integral,
+        prev_error, prev_derivative, p_term, i_term, d_term)
+    """
+    sample, temperature, state, p_term, i_term, d_term = _simulate_core(
+        setpoint_array, run_ends,
+        _pid_control_ti, (kp, ti, 1.0 / ti, td), (0.0, 0.0, 0.0), output_min, output_max,
+        heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+        initial_temp, dt, max_skip, tolerance, stride,
+        out,
+    )
+    integral, prev_error, prev_derivative = state
+    return sample, temperature, integral, prev_error, prev_derivative, p_term, i_term, d_term
+
+
+@njit(_PID_SIGNATURE, cache=True, nogil=True, fastmath=True, boundscheck=False)
+def _simulate_core_noti(
+    setpoint_array, run_ends,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, max_skip, tolerance, stride,
+    out,
+):
+    """_simulate_core_ti for ti <= 0 (I term disabled)."""
+    sample, temperature, state, p_term, i_term, d_term = _simulate_core(
+        setpoint_array, run_ends,
+        _pid_control_noti, (kp, ti, 0.0, td), (0.0, 0.0, 0.0), output_min, output_max,
+        heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+        initial_temp, dt, max_skip, tolerance, stride,
+        out,
+    )
+    integral, prev_error, prev_derivative = state
+    return sample, temperature, integral, prev_error, prev_derivative, p_term, i_term, d_term
+
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _simulate_fixed_core(
+    setpoint_array, run_ends,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, stride,
+    out,
+):
+    """
+    _simulate_core with the PID controller and fixed time steps (max_skip
+    and tolerance are constants here, so the adaptive stepping compiles out).
+    One run of _simulate_batch_core.
+    """
+    if ti > 0:
+        _simulate_core(
+            setpoint_array, run_ends,
+            _pid_control_ti, (kp, ti, 1.0 / ti, td), (0.0, 0.0, 0.0), output_min, output_max,
+            heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+            initial_temp, dt, 1, 0.0, stride,
+            out,
+        )
+    else:
+        _simulate_core(
+            setpoint_array, run_ends,
+            _pid_control_noti, (kp, ti, 0.0, td), (0.0, 0.0, 0.0), output_min, output_max,
+            heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+            initial_temp, dt, 1, 0.0, stride,
+            out,
+        )
+
+
+@njit(cache=True, fastmath=True, boundscheck=False, parallel=True)
+def _simulate_batch_core(
+    setpoint_array, run_ends,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, stride,
+    out,
+):
+    """
+    Run _simulate_fixed_core for every (kp[i], ti[i], td[i]) in parallel.
+    
+    Runs are independent (all state is local to the kernel call), each one
+    writes its fixed-step results (every stride-th step) into out[i],
+    shape (runs, 8, N).
+    """
+    for run in prange(kp.shape[0]):
+        _simulate_fixed_core(
+            setpoint_array, run_ends,
+            kp[run], ti[run], td[run], output_min, output_max,
+            heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+            initial_temp, dt, stride,
+            out[run],
+        )
+
+
+@njit(_FUZZY_SIGNATURE, nogil=True, fastmath=True, boundscheck=False)
+def _simulate_fuzzy_core(
+    setpoint_array, run_ends,
+    output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, max_skip, tolerance, stride,
+    out,
+):
+    """
+    _simulate_core with the fuzzy controller (FuzzyController with
+    exact=False); its P/I/D rows are zeros.
+    
+    Returns:
+        Tuple of (samples written, and final temperature, prev_error)
+    """
+    sample, temperature, state, _, _, _ = _simulate_core(
+        setpoint_array, run_ends,
+        _fuzzy_control, (), (0.0,), output_min, output_max,
+        heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+        initial_temp, dt, max_skip, tolerance, stride,
+        out,
+    )
+    return sample, temperature, state[0]
+
+
+@njit(inline='always')
+def _simulate_fast_core(
+    temps, step_counts, sample_steps,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, tolerance,
+    out, integrate,
+):
+    """
+    PID + thermal model loop that integrates each stage only until settled.
+    
+    Steps are computed as in _simulate_core until |error| and |D| drop
+    below tolerance. The rest of the stage is held at the steady-state
+    power h * (setpoint - ambient) and the temperature follows the exact
+    solution for constant power, evaluated only at sample_steps. Only
+    steps listed in sample_steps (sorted) are written to out.
+    
+    Only compiled through _simulate_fast_core_ti / _simulate_fast_core_noti
+    (integrate is a constant, ti > 0). Without the I term the controller
+    cannot hold the steady-state power at zero error, so every stage is
+    stepped to its end and there is no hold.
+    
+    Returns:
+        Tuple of (samples written, and final temperature, integral,
+        prev_error, prev_derivative, p_term, i_term, d_term)
+    """
+    inv_dt = 1.0 / dt
+    inv_heat_capacity = 1.0 / heat_capacity
+    decay, gain = _thermal_coefficients(inv_heat_capacity, heat_loss_coef, dt)
+    inv_ti = 1.0 / ti if integrate else 0.0
+    
+    temperature = initial_temp
+    integral = 0.0
+    prev_error = 0.0
+    prev_derivative = 0.0
+    p_term = 0.0
+    i_term = 0.0
+    d_term = 0.0
+    
+    num_samples = sample_steps.shape[0]
+    step = 0
+    sample = 0
+    
+    for stage in range(temps.shape[0]):
+        setpoint = temps[stage]
+        stage_end = step + step_counts[stage]
+        
+        # Transient: regular steps until settled at the setpoint
+        while step < stage_end:
+            current_temp = temperature
+            error = setpoint - current_temp
+            if integrate and kp != 0 and abs(error) < tolerance and abs(d_term) < tolerance:
+                break
+            
+            # PID controller
+            output_clamped, integral, prev_derivative, p_term, i_term, d_term = _pid_step(
+                error, prev_error, prev_derivative, integral, dt, inv_dt,
+                kp, ti, inv_ti, td, output_min, output_max, integrate,
+            )
+            prev_error = error
+            
+            temperature = _thermal_step(temperature, output_clamped, heating_power, cooling_power,
+                                        heat_loss_coef, ambient_temp, decay, gain)
+            
+            if sample < num_samples and sample_steps[sample] == step:
+                out[0, sample] = step * dt
+                out[1, sample] = current_temp
+                out[2, sample] = setpoint
+                out[3, sample] = output_clamped
+                out[4, sample] = error
+                out[5, sample] = p_term
+                out[6, sample] = i_term
+                out[7, sample] = d_term
+                sample += 1
+            step += 1
+        
+        if step == stage_end:
+            continue
+        
+        # Hold: constant steady-state power, exact temperature at the sampled steps
+        hold_power = min(max(heat_loss_coef * (setpoint - ambient_temp), output_min), output_max)
+        hold_start = step
+        hold_temp = temperature
+        while sample < num_samples and sample_steps[sample] < stage_end:
+            held = sample_steps[sample] - hold_start
+            held_decay, held_gain = _thermal_coefficients(inv_heat_capacity, heat_loss_coef, held * dt)
+            current_temp = _thermal_step(hold_temp, hold_power, heating_power, cooling_power,
+                                         heat_loss_coef, ambient_temp, held_decay, held_gain)
+            error = setpoint - current_temp
+            out[0, sample] = sample_steps[sample] * dt
+            out[1, sample] = current_temp
+            out[2, sample] = setpoint
+            out[3, sample] = hold_power
+            out[4, sample] = error
+            out[5, sample] = error
+            out[6, sample] = hold_power / kp - error
+            out[7, sample] = 0.0
+            sample += 1
+        
+        held_decay, held_gain = _thermal_coefficients(
+            inv_heat_capacity, heat_loss_coef, (stage_end - hold_start) * dt
+        )
+        temperature = _thermal_step(hold_temp, hold_power, heating_power, cooling_power,
+                                    heat_loss_coef, ambient_temp, held_decay, held_gain)
+        
+        # Controller state that reproduces hold_power at the end of the stage
+        error = setpoint - temperature
+        p_term = error
+        i_term = hold_power / kp - error
+        integral = i_term * ti
+        d_term = 0.0
+        prev_error = error
+        prev_derivative = 0.0
+        step = stage_end
+    
+    return sample, temperature, integral, prev_error, prev_derivative, p_term, i_term, d_term
+
+
+@njit(_FAST_SIGNATURE, cache=True, nogil=True, fastmath=True, boundscheck=False)
+def _simulate_fast_core_ti(
+    temps, step_counts, sample_steps,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, tolerance,
+    out,
+):
+    """_simulate_fast_core specialized for ti > 0 (settled stages are held)."""
+    return _simulate_fast_core(
+        temps, step_counts, sample_steps,
+        kp, ti, td, output_min, output_max,
+        heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+        initial_temp, dt, tolerance,
+        out, True,
+    )
+
+
+@njit(_FAST_SIGNATURE, cache=True, nogil=True, fastmath=True, boundscheck=False)
+def _simulate_fast_core_noti(
+    temps, step_counts, sample_steps,
+    kp, ti, td, output_min, output_max,
+    heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+    initial_temp, dt, tolerance,
+    out,
+):
+    """_simulate_fast_core specialized for ti <= 0 (every step is simulated)."""
+    return _simulate_fast_core(
+        temps, step_counts, sample_steps,
+        kp, ti, td, output_min, output_max,
+        heat_capacity, heating_power, cooling_power, heat_loss_coef, ambient_temp,
+        initial_temp, dt, tolerance,
+        out, False,
+    )
 
 
 class PCRSimulator:
@@ -27,6 +555,7 @@ class PCRSimulator:
         thermal_model: ThermalModel,
         pid_controller: PIDController,
         time_step: float = TIME_STEP,
+        adaptive: bool = False,
     ):
         """
         Initialize PCR simulator.
@@ -34,11 +563,17 @@ class PCRSimulator:
         Args:
             thermal_model: ThermalModel instance
             pid_controller: PIDController instance
-            time_step: Simulation time step (seconds)
+            time_step: Simulation time step (seconds), must be positive
+            adaptive: Take ADAPTIVE_STEP_FACTOR-times longer steps while the
+                temperature is settled at a constant setpoint
         """
+        if time_step <= 0:
+            raise ValueError(f"time_step must be positive, got {time_step}")
+        
         self.thermal_model = thermal_model
         self.pid_controller = pid_controller
         self.time_step = time_step
+        self.adaptive = adaptive
     
     def _build_protocol(
         self,
@@ -55,49 +590,229 @@ class PCRSimulator:
         final_duration: float,
         hold_temp: float = 10.0,
         hold_duration: float = 60.0,
-    ) -> list[tuple[float, float]]:
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
         Build complete PCR protocol from parameters.
         
         Returns:
-            List of (temperature, duration) tuples
+            Tuple of (temperatures, durations) arrays, one entry per stage
         """
-        protocol = []
+        num_stages = 3 * num_cycles + 3
+        temps = np.empty(num_stages, dtype=np.float64)
+        durations = np.empty(num_stages, dtype=np.float64)
         
         # Initial denaturation
-        protocol.append((initial_temp, initial_duration))
+        temps[0], durations[0] = initial_temp, initial_duration
         
         # Cycling stages (repeated num_cycles times)
-        for _ in range(num_cycles):
-            protocol.append((denat_temp, denat_duration))
-            protocol.append((anneal_temp, anneal_duration))
-            protocol.append((extension_temp, extension_duration))
+        temps[1:-2] = np.tile((denat_temp, anneal_temp, extension_temp), num_cycles)
+        durations[1:-2] = np.tile((denat_duration, anneal_duration, extension_duration), num_cycles)
         
         # Final extension
-        protocol.append((final_temp, final_duration))
+        temps[-2], durations[-2] = final_temp, final_duration
         
         # Hold
-        protocol.append((hold_temp, hold_duration))
+        temps[-1], durations[-1] = hold_temp, hold_duration
+        
+        return temps, durations
+    
+    def _sample_stride(self, num_steps: int) -> int:
+        """
+        Steps between stored samples, so at most DOWNSAMPLE_THRESHOLD are kept.
+        
+        Args:
+            num_steps: Number of simulation steps
+        
+        Returns:
+            Stride (1 if no downsampling is needed)
+        """
+        return max(1, -(-num_steps // DOWNSAMPLE_THRESHOLD))
+    
+    def _step_counts(self, durations: np.ndarray) -> np.ndarray:
+        """
+        Number of simulation steps per stage, round(duration / time_step).
+        
+        Args:
+            durations: Stage durations (s)
+        
+        Returns:
+            Step counts (int64)
+        """
+        return np.rint(durations / self.time_step).astype(np.int64)
+    
+    def _setpoint_schedule(self, temps: np.ndarray, step_counts: np.ndarray) -> np.ndarray:
+        """
+        Expand the protocol into one setpoint per simulation step.
+        
+        Args:
+            temps: Stage temperatures (°C)
+            step_counts: Simulation steps per stage
+        
+        Returns:
+            Setpoint array (°C), each stage repeated for its number of steps
+        """
+        return np.repeat(temps, step_counts)
+    
+    def _setpoint_runs(self, temps: np.ndarray, step_counts: np.ndarray) -> np.ndarray:
+        """
+        End steps of the runs of equal setpoints (consecutive stages at one temperature).
+        
+        Args:
+            temps: Stage temperatures (°C)
+            step_counts: Simulation steps per stage
         
-        return protocol
+        Returns:
+            Exclusive end step of every run (int64), the last one is the total step count
+        """
+        nonempty = step_counts > 0
+        temps = temps[nonempty]
+        ends = np.cumsum(step_counts)[nonempty]
+        run_last = np.ones(len(temps), dtype=bool)
+        run_last[:-1] = temps[1:] != temps[:-1]
+        return ends[run_last]
     
-    def _downsample(self, data: np.ndarray, max_points: int = DOWNSAMPLE_THRESHOLD) -> np.ndarray:
+    def _simulate_compiled(
+        self, setpoint_array: np.ndarray, run_ends: np.ndarray, stride: int, out: np.ndarray
+    ) -> int:
         """
-        Downsample data for visualization if it exceeds max_points.
+        Run the setpoint schedule through the compiled PID + thermal kernel.
+        
+        The controller and thermal model only supply parameters; their
+        final state is written back so they look as after the object loop.
         
         Args:
-            data: Input array
-            max_points: Maximum number of points to keep
+            setpoint_array: Setpoint for every time step (°C)
+            run_ends: End step of every constant-setpoint run
+            stride: Store every stride-th step
+            out: Output array, shape (8, N), rows ordered as _FIELDS
         
         Returns:
-            Downsampled array
+            Number of samples written into arrays
         """
-        if len(data) <= max_points:
-            return data
+        pid = self.pid_controller
+        thermal = self.thermal_model
+        simulate_core = _simulate_core_ti if pid.ti > 0 else _simulate_core_noti
+        (
+            num_samples, thermal.temperature,
+            pid.integral, pid.prev_error, pid.prev_derivative,
+            pid.p_term, pid.i_term, pid.d_term,
+        ) = simulate_core(
+            setpoint_array, run_ends,
+            float(pid.kp), float(pid.ti), float(pid.td),
+            float(pid.output_min), float(pid.output_max),
+            float(thermal.total_heat_capacity), float(thermal.heating_power),
+            float(thermal.cooling_power), float(thermal.heat_loss_coef),
+            float(thermal.ambient_temp), float(thermal.temperature),
+            float(self.time_step),
+            ADAPTIVE_STEP_FACTOR if self.adaptive else 1,
+            float(ADAPTIVE_STEP_TOLERANCE),
+            stride,
+            out,
+        )
+        return num_samples
+    
+    def _simulate_fuzzy_compiled(
+        self, setpoint_array: np.ndarray, run_ends: np.ndarray, stride: int, out: np.ndarray
+    ) -> int:
+        """
+        Run the setpoint schedule through the compiled fuzzy + thermal kernel.
+        
+        Args:
+            setpoint_array: Setpoint for every time step (°C)
+            run_ends: End step of every constant-setpoint run
+            stride: Store every stride-th step
+            out: Output array, shape (8, N), rows ordered as _FIELDS
         
-        # Use linear interpolation downsampling
-        indices = np.linspace(0, len(data) - 1, max_points, dtype=int)
-        return data[indices]
+        Returns:
+            Number of samples written into arrays
+        """
+        fuzzy = self.pid_controller
+        thermal = self.thermal_model
+        num_samples, thermal.temperature, fuzzy.prev_error = _simulate_fuzzy_core(
+            setpoint_array, run_ends,
+            float(fuzzy.output_min), float(fuzzy.output_max),
+            float(thermal.total_heat_capacity), float(thermal.heating_power),
+            float(thermal.cooling_power), float(thermal.heat_loss_coef),
+            float(thermal.ambient_temp), float(thermal.temperature),
+            float(self.time_step),
+            ADAPTIVE_STEP_FACTOR if self.adaptive else 1,
+            float(ADAPTIVE_STEP_TOLERANCE),
+            stride,
+            out,
+        )
+        return num_samples
+    
+    def _simulate_objects(
+        self, setpoint_array: np.ndarray, run_ends: np.ndarray, stride: int, out: np.ndarray
+    ) -> int:
+        """
+        Run the setpoint schedule calling the controller and thermal model each step.
+        
+        Used for controllers without a compiled kernel (e.g. FuzzyController with
+        exact=True).
+        
+        Args:
+            setpoint_array: Setpoint for every time step (°C)
+            run_ends: End step of every constant-setpoint run
+            stride: Store every stride-th step
+            out: Output array, shape (8, N), rows ordered as _FIELDS
+        
+        Returns:
+            Number of samples written into arrays
+        """
+        # Python floats, so controller and thermal math avoids numpy scalar ops
+        setpoints = setpoint_array.tolist()
+        run_ends = run_ends.tolist()
+        
+        max_skip = ADAPTIVE_STEP_FACTOR if self.adaptive else 1
+        num_steps = len(setpoints)
+        run = 0
+        step = 0
+        sample = 0
+        next_sample = 0
+        controller = self.pid_controller
+        
+        while step < num_steps:
+            setpoint = setpoints[step]
+            
+            # Get current state
+            current_temp = self.thermal_model.temperature
+            
+            # Step length: max_skip steps while settled inside a constant-setpoint run
+            skip = 1
+            if (
+                max_skip > 1
+                and abs(setpoint - current_temp) < ADAPTIVE_STEP_TOLERANCE
+                and abs(controller.d_term) < ADAPTIVE_STEP_TOLERANCE
+            ):
+                while run_ends[run] <= step:
+                    run += 1
+                if step + max_skip <= run_ends[run]:
+                    skip = max_skip
+            step_dt = skip * self.time_step
+            
+            # Calculate control output
+            control_output = controller.update(setpoint, current_temp, step_dt)
+            
+            # Update thermal model
+            self.thermal_model.update(control_output, step_dt)
+            
+            # Store data (first step taken in every stride)
+            if step >= next_sample:
+                out[0, sample] = step * self.time_step
+                out[1, sample] = current_temp
+                out[2, sample] = setpoint
+                out[3, sample] = control_output
+                out[4, sample] = setpoint - current_temp
+                out[5, sample] = controller.p_term
+                out[6, sample] = controller.i_term
+                out[7, sample] = controller.d_term
+                sample += 1
+                next_sample = (step // stride + 1) * stride
+            
+            step += skip
+        
+        return sample
     
     def simulate(
         self,
@@ -134,7 +849,8 @@ class PCRSimulator:
             hold_duration: Hold duration (s)
         
         Returns:
-            Dictionary containing:
+            Dictionary of equal-length 1-D float32 np.ndarray (never Python lists),
+            downsampled to at most DOWNSAMPLE_THRESHOLD points, containing:
                 - time: Time array (s)
                 - temperature: Actual temperature array (°C)
                 - setpoint: Setpoint temperature array (°C)
@@ -145,7 +861,7 @@ class PCRSimulator:
                 - d_term: D component array
         """
         # Build protocol
-        protocol = self._build_protocol(
+        temps, durations = self._build_protocol(
             initial_temp, initial_duration,
             denat_temp, denat_duration,
             anneal_temp, anneal_duration,
@@ -155,87 +871,321 @@ class PCRSimulator:
             hold_temp, hold_duration,
         )
         
-        # Calculate total simulation time
-        total_time = sum(duration for _, duration in protocol)
-        num_steps = int(total_time / self.time_step) + 1
+        # One setpoint per step (integer step counts per stage), so the loop
+        # needs no stage bookkeeping; run_ends bound the adaptive long steps
+        step_counts = self._step_counts(durations)
+        setpoint_array = self._setpoint_schedule(temps, step_counts)
+        run_ends = self._setpoint_runs(temps, step_counts)
+        num_steps = len(setpoint_array)
         
-        # Initialize arrays
-        time_array = np.zeros(num_steps)
-        temp_array = np.zeros(num_steps)
-        setpoint_array = np.zeros(num_steps)
-        control_array = np.zeros(num_steps)
-        error_array = np.zeros(num_steps)
-        p_array = np.zeros(num_steps)
-        i_array = np.zeros(num_steps)
-        d_array = np.zeros(num_steps)
+        # Downsampling is fused into the loop: only every stride-th step is stored
+        stride = self._sample_stride(num_steps)
+        num_out = -(-num_steps // stride)
+        
+        # One preallocated block for all fields (adaptive stepping may fill fewer columns).
+        # float32 is plenty for visualization; controller/thermal state stays float64.
+        out = np.empty((len(_FIELDS), num_out), dtype=np.float32)
         
         # Reset controllers
         self.thermal_model.reset()
         self.pid_controller.reset()
         
-        # Initial conditions
-        current_time = 0.0
-        step = 0
+        controller = self.pid_controller
+        compiled_thermal = isinstance(self.thermal_model, ThermalModel)
+        if compiled_thermal and isinstance(controller, PIDController):
+            num_samples = self._simulate_compiled(setpoint_array, run_ends, stride, out)
+        elif compiled_thermal and isinstance(controller, FuzzyController) and not controller.exact:
+            num_samples = self._simulate_fuzzy_compiled(setpoint_array, run_ends, stride, out)
+        else:
+            num_samples = self._simulate_objects(setpoint_array, run_ends, stride, out)
         
-        # Simulate each stage
-        for stage_temp, stage_duration in protocol:
-            stage_end_time = current_time + stage_duration
-            
-            while current_time < stage_end_time and step < num_steps:
-                # Get current state
-                current_temp = self.thermal_model.temperature
-                
-                # Calculate control output
-                control_output = self.pid_controller.update(
-                    stage_temp, current_temp, self.time_step
-                )
-                
-                # Update thermal model
-                new_temp = self.thermal_model.update(control_output, self.time_step)
-                
-                # Store data
-                time_array[step] = current_time
-                temp_array[step] = current_temp
-                setpoint_array[step] = stage_temp
-                control_array[step] = control_output
-                error_array[step] = stage_temp - current_temp
-                p_term, i_term, d_term = self.pid_controller.get_components()
-                p_array[step] = p_term
-                i_array[step] = i_term
-                d_array[step] = d_term
-                
-                # Advance time
-                current_time += self.time_step
-                step += 1
-        
-        # Trim arrays to actual length
-        time_array = time_array[:step]
-        temp_array = temp_array[:step]
-        setpoint_array = setpoint_array[:step]
-        control_array = control_array[:step]
-        error_array = error_array[:step]
-        p_array = p_array[:step]
-        i_array = i_array[:step]
-        d_array = d_array[:step]
-        
-        # Downsample for visualization
-        if len(time_array) > DOWNSAMPLE_THRESHOLD:
-            time_array = self._downsample(time_array)
-            temp_array = self._downsample(temp_array)
-            setpoint_array = self._downsample(setpoint_array)
-            control_array = self._downsample(control_array)
-            error_array = self._downsample(error_array)
-            p_array = self._downsample(p_array)
-            i_array = self._downsample(i_array)
-            d_array = self._downsample(d_array)
-        
-        return {
-            'time': time_array,
-            'temperature': temp_array,
-            'setpoint': setpoint_array,
-            'control': control_array,
-            'error': error_array,
-            'p_term': p_array,
-            'i_term': i_array,
-            'd_term': d_array,
-        }
+        # Exactly num_out samples, unless adaptive stepping merged some steps
+        if num_samples < num_out:
+            out = out[:, :num_samples]
+        
+        # Rows are returned as views, no copies
+        return dict(zip(_FIELDS, out))
+    
+    def simulate_fast(
+        self,
+        initial_temp: float,
+        initial_duration: float,
+        denat_temp: float,
+        denat_duration: float,
+        anneal_temp: float,
+        anneal_duration: float,
+        extension_temp: float,
+        extension_duration: float,
+        num_cycles: int,
+        final_temp: float,
+        final_duration: float,
+        hold_temp: float = 10.0,
+        hold_duration: float = 60.0,
+    ) -> dict:
+        """
+        Run complete PCR simulation, propagating settled holds analytically.
+        
+        Each stage is simulated step by step only until the temperature has
+        settled at the setpoint (|error| and |D| below ADAPTIVE_STEP_TOLERANCE).
+        For the rest of the stage the control output is fixed at the
+        steady-state power h * (setpoint - ambient) and the temperature is
+        evaluated in closed form, only at the time points simulate() would
+        return. This is an approximation for visualization; the gain depends
+        on how early the stages settle. Only a controller with an I term
+        (ti > 0) holds that power at zero error; with ti <= 0 every step is
+        simulated. Controllers other than PIDController (and thermal models
+        other than ThermalModel) run simulate() instead.
+        
+        Args:
+            Same as simulate()
+        
+        Returns:
+            Dictionary of results, same fields and sampling as simulate()
+        """
+        if not (
+            isinstance(self.pid_controller, PIDController)
+            and isinstance(self.thermal_model, ThermalModel)
+        ):
+            return self.simulate(
+                initial_temp, initial_duration,
+                denat_temp, denat_duration,
+                anneal_temp, anneal_duration,
+                extension_temp, extension_duration,
+                num_cycles,
+                final_temp, final_duration,
+                hold_temp, hold_duration,
+            )
+        
+        temps, durations = self._build_protocol(
+            initial_temp, initial_duration,
+            denat_temp, denat_duration,
+            anneal_temp, anneal_duration,
+            extension_temp, extension_duration,
+            num_cycles,
+            final_temp, final_duration,
+            hold_temp, hold_duration,
+        )
+        step_counts = self._step_counts(durations)
+        
+        # Steps stored by simulate()
+        num_steps = int(step_counts.sum())
+        sample_steps = np.arange(0, num_steps, self._sample_stride(num_steps), dtype=np.int64)
+        out = np.empty((len(_FIELDS), len(sample_steps)), dtype=np.float32)
+        
+        # Reset controllers
+        self.thermal_model.reset()
+        self.pid_controller.reset()
+        
+        pid = self.pid_controller
+        thermal = self.thermal_model
+        simulate_fast_core = _simulate_fast_core_ti if pid.ti > 0 else _simulate_fast_core_noti
+        (
+            num_samples, thermal.temperature,
+            pid.integral, pid.prev_error, pid.prev_derivative,
+            pid.p_term, pid.i_term, pid.d_term,
+        ) = simulate_fast_core(
+            temps, step_counts, sample_steps,
+            float(pid.kp), float(pid.ti), float(pid.td),
+            float(pid.output_min), float(pid.output_max),
+            float(thermal.total_heat_capacity), float(thermal.heating_power),
+            float(thermal.cooling_power), float(thermal.heat_loss_coef),
+            float(thermal.ambient_temp), float(thermal.temperature),
+            float(self.time_step),
+            float(ADAPTIVE_STEP_TOLERANCE),
+            out,
+        )
+        
+        return dict(zip(_FIELDS, out[:, :num_samples]))
+    
+    def _sweep_gains(
+        self, kp: np.ndarray, ti: np.ndarray, td: np.ndarray
+    ) -> tuple[tuple, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Broadcast sweep gains against each other and flatten them to one run each.
+        
+        Args:
+            kp: Proportional gains (any shape)
+            ti: Integration times (seconds)
+            td: Derivative times (seconds)
+        
+        Returns:
+            Tuple of (broadcast shape, and kp, ti, td as contiguous 1-D float64 arrays)
+        """
+        kp, ti, td = np.broadcast_arrays(np.atleast_1d(kp), ti, td)
+        return (kp.shape, *(np.array(gains, dtype=np.float64).reshape(-1) for gains in (kp, ti, td)))
+    
+    def _sweep_result(self, out: np.ndarray, grid_shape: tuple) -> dict:
+        """
+        Split the (runs, 8, N) sweep output into fields shaped like the gain grid.
+        
+        Args:
+            out: Sweep output, one (8, N) block per run, rows ordered as _FIELDS
+            grid_shape: Broadcast shape of the gains
+        
+        Returns:
+            Dictionary of views of out, each of shape (*grid_shape, N)
+        """
+        out = out.reshape(grid_shape + out.shape[1:])
+        return dict(zip(_FIELDS, np.moveaxis(out, -2, 0)))
+    
+    def simulate_batch(
+        self,
+        kp: np.ndarray,
+        ti: np.ndarray,
+        td: np.ndarray,
+        initial_temp: float,
+        initial_duration: float,
+        denat_temp: float,
+        denat_duration: float,
+        anneal_temp: float,
+        anneal_duration: float,
+        extension_temp: float,
+        extension_duration: float,
+        num_cycles: int,
+        final_temp: float,
+        final_duration: float,
+        hold_temp: float = 10.0,
+        hold_duration: float = 60.0,
+    ) -> dict:
+        """
+        Run complete PCR simulation for a batch of PID gains in parallel.
+        
+        Every run uses the thermal model and the output limits of
+        pid_controller, starting from ambient temperature like simulate().
+        Runs are spread over the CPU cores; the simulator's own controller
+        and thermal model are left untouched. Always uses fixed time steps.
+        
+        Args:
+            kp: Proportional gains, one run per element after broadcasting
+                against ti and td (any shape, e.g. a np.meshgrid grid)
+            ti: Integration times (seconds)
+            td: Derivative times (seconds)
+            Remaining arguments as in simulate()
+        
+        Returns:
+            Dictionary with the fields of simulate(), each a float32
+            np.ndarray of shape (*gains shape, samples)
+        """
+        grid_shape, kp, ti, td = self._sweep_gains(kp, ti, td)
+        
+        temps, durations = self._build_protocol(
+            initial_temp, initial_duration,
+            denat_temp, denat_duration,
+            anneal_temp, anneal_duration,
+            extension_temp, extension_duration,
+            num_cycles,
+            final_temp, final_duration,
+            hold_temp, hold_duration,
+        )
+        step_counts = self._step_counts(durations)
+        setpoint_array = self._setpoint_schedule(temps, step_counts)
+        run_ends = self._setpoint_runs(temps, step_counts)
+        stride = self._sample_stride(len(setpoint_array))
+        num_out = -(-len(setpoint_array) // stride)
+        out = np.empty((len(kp), len(_FIELDS), num_out), dtype=np.float32)
+        
+        pid = self.pid_controller
+        thermal = self.thermal_model
+        _simulate_batch_core(
+            setpoint_array, run_ends,
+            kp, ti, td,
+            float(pid.output_min), float(pid.output_max),
+            float(thermal.total_heat_capacity), float(thermal.heating_power),
+            float(thermal.cooling_power), float(thermal.heat_loss_coef),
+            float(thermal.ambient_temp), float(thermal.ambient_temp),
+            float(self.time_step),
+            stride,
+            out,
+        )
+        
+        return self._sweep_result(out, grid_shape)
+    
+    def simulate_sweep_gpu(
+        self,
+        kp: np.ndarray,
+        ti: np.ndarray,
+        td: np.ndarray,
+        initial_temp: float,
+        initial_duration: float,
+        denat_temp: float,
+        denat_duration: float,
+        anneal_temp: float,
+        anneal_duration: float,
+        extension_temp: float,
+        extension_duration: float,
+        num_cycles: int,
+        final_temp: float,
+        final_duration: float,
+        hold_temp: float = 10.0,
+        hold_duration: float = 60.0,
+        threads_per_block: int = 128,
+    ) -> dict:
+        """
+        Run complete PCR simulation for a batch of PID gains on a CUDA GPU.
+        
+        GPU counterpart of simulate_batch(), one GPU thread per run; worth it
+        for large tuning sweeps (thousands of gain combinations), not for
+        single runs. simulate() and simulate_batch() stay CPU-only.
+        
+        Args:
+            kp: Proportional gains, one run per element after broadcasting
+                against ti and td (any shape, e.g. a np.meshgrid grid)
+            ti: Integration times (seconds)
+            td: Derivative times (seconds)
+            Protocol arguments as in simulate()
+            threads_per_block: CUDA block size
+        
+        Returns:
+            Dictionary with the fields of simulate(), each a float32
+            np.ndarray of shape (*gains shape, samples)
+        
+        Raises:
+            RuntimeError: If numba's CUDA support or a CUDA device is unavailable
+        """
+        try:
+            from numba import cuda
+            from cuda_sweep import sweep_kernel
+        except ImportError as exc:
+            raise RuntimeError("GPU sweeps need numba with CUDA support") from exc
+        if not cuda.is_available():
+            raise RuntimeError("GPU sweeps need a CUDA-capable device and driver")
+        
+        grid_shape, kp, ti, td = self._sweep_gains(kp, ti, td)
+        
+        temps, durations = self._build_protocol(
+            initial_temp, initial_duration,
+            denat_temp, denat_duration,
+            anneal_temp, anneal_duration,
+            extension_temp, extension_duration,
+            num_cycles,
+            final_temp, final_duration,
+            hold_temp, hold_duration,
+        )
+        setpoint_array = self._setpoint_schedule(temps, self._step_counts(durations))
+        stride = self._sample_stride(len(setpoint_array))
+        num_out = -(-len(setpoint_array) // stride)
+        
+        # No runs, no launch (a grid of zero blocks is an invalid CUDA launch)
+        if len(kp) == 0:
+            out = np.empty((0, len(_FIELDS), num_out), dtype=np.float32)
+            return self._sweep_result(out, grid_shape)
+        
+        device_out = cuda.device_array((len(kp), len(_FIELDS), num_out), dtype=np.float32)
+        
+        pid = self.pid_controller
+        thermal = self.thermal_model
+        blocks = -(-len(kp) // threads_per_block)
+        sweep_kernel[blocks, threads_per_block](
+            cuda.to_device(setpoint_array),
+            cuda.to_device(kp), cuda.to_device(ti), cuda.to_device(td),
+            float(pid.output_min), float(pid.output_max),
+            float(thermal.total_heat_capacity), float(thermal.heating_power),
+            float(thermal.cooling_power), float(thermal.heat_loss_coef),
+            float(thermal.ambient_temp), float(thermal.ambient_temp),
+            float(self.time_step),
+            stride,
+            device_out,
+        )
+        out = device_out.copy_to_host()
+        
+        return self._sweep_result(out, grid_shape)
@@ -95,11 +95,12 @@ class PIDController:
         # Calculate total output
         output = self.kp * (self.p_term + self.i_term + self.d_term)
         
-        # Apply output limits
-        output_clamped = max(self.output_min, min(output, self.output_max))
+        # Apply output limits (min/max pair, no compare-and-branch)
+        output_clamped = min(max(output, self.output_min), self.output_max)
+        saturated = output_clamped != output
         
         # Anti-windup: Back-calculate integral if output is saturated
-        if output != output_clamped and self.ti > 0:
+        if saturated and self.ti > 0:
             # Clamp integral to prevent further windup
             # Calculate what integral should be to keep output at limit
             max_i_term = (output_clamped / self.kp) - self.p_term - self.d_term
@@ -129,6 +130,20 @@ class PIDController:
         """
         return (self.p_term, self.i_term, self.d_term)
     
+    def fill_components(self, p_array, i_array, d_array, step: int):
+        """
+        Store individual PID component values (for visualization) in place.
+        
+        Args:
+            p_array: Array receiving the P contribution
+            i_array: Array receiving the I contribution
+            d_array: Array receiving the D contribution
+            step: Index to write at
+        """
+        p_array[step] = self.p_term
+        i_array[step] = self.i_term
+        d_array[step] = self.d_term
+    
     def set_output_limits(self, output_min: float, output_max: float):
         """
         Update output limits.
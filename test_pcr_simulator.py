@@ -0,0 +1,127 @@
+"""
+Regression checks for the simulation kernels (run with python -m pytest).
+The compiled kernels duplicate the object loop; these keep them in agreement.
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from thermal_model import ThermalModel
+from pid_controller import PIDController
+from fuzzy_controller import FuzzyController
+from pcr_simulator import PCRSimulator
+
+# Short protocol with a long final hold (settles, so adaptive and fast paths kick in)
+PROTOCOL = dict(
+    initial_temp=95, initial_duration=60,
+    denat_temp=95, denat_duration=20,
+    anneal_temp=58, anneal_duration=20,
+    extension_temp=72, extension_duration=30,
+    num_cycles=3,
+    final_temp=72, final_duration=600,
+)
+
+
+def make_simulator(controller=None, adaptive=False):
+    return PCRSimulator(ThermalModel(), controller or PIDController(), adaptive=adaptive)
+
+
+def assert_results_equal(result, expected, atol=0.0):
+    assert result.keys() == expected.keys()
+    for field in expected:
+        np.testing.assert_allclose(result[field], expected[field], rtol=0, atol=atol, err_msg=field)
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+@pytest.mark.parametrize("controller", [
+    lambda: PIDController(ti=4.1),
+    lambda: PIDController(ti=0.0),
+    lambda: FuzzyController(),
+], ids=["pid", "pid-no-ti", "fuzzy"])
+def test_compiled_kernel_matches_object_loop(monkeypatch, controller, adaptive):
+    compiled = make_simulator(controller(), adaptive).simulate(**PROTOCOL)
+
+    monkeypatch.setattr(PCRSimulator, "_simulate_compiled", PCRSimulator._simulate_objects)
+    monkeypatch.setattr(PCRSimulator, "_simulate_fuzzy_compiled", PCRSimulator._simulate_objects)
+    objects = make_simulator(controller(), adaptive).simulate(**PROTOCOL)
+
+    assert_results_equal(compiled, objects, atol=1e-4)
+
+
+def test_batch_rows_match_simulate():
+    kp = np.array([50.0, 92.0])
+    ti = np.array([4.1, 0.0])
+    td = np.array([14.0, 2.0])
+    batch = make_simulator().simulate_batch(kp, ti, td, **PROTOCOL)
+
+    for run in range(len(kp)):
+        single = make_simulator(PIDController(kp=kp[run], ti=ti[run], td=td[run])).simulate(**PROTOCOL)
+        assert_results_equal({field: values[run] for field, values in batch.items()}, single)
+
+
+def test_batch_keeps_gain_grid_shape():
+    kp, ti = np.meshgrid([50.0, 92.0], [0.0, 2.0, 4.1])
+    grid = make_simulator().simulate_batch(kp, ti, 14.0, **PROTOCOL)
+    flat = make_simulator().simulate_batch(kp.ravel(), ti.ravel(), 14.0, **PROTOCOL)
+
+    assert grid["time"].shape[:-1] == kp.shape
+    assert_results_equal({field: values.reshape(flat[field].shape) for field, values in grid.items()}, flat)
+
+
+# Long holds, so simulate_fast settles and takes the closed-form hold
+FAST_PROTOCOL = dict(PROTOCOL, final_duration=1800, hold_duration=1800)
+
+
+def test_simulate_fast_close_to_simulate():
+    gains = dict(kp=92.0, ti=4.1, td=14.0, output_min=-500.0, output_max=500.0)
+    reference = make_simulator(PIDController(**gains)).simulate(**FAST_PROTOCOL)
+    fast = make_simulator(PIDController(**gains)).simulate_fast(**FAST_PROTOCOL)
+
+    np.testing.assert_array_equal(fast["time"], reference["time"])
+    for field in ("temperature", "error", "p_term", "i_term", "d_term"):
+        np.testing.assert_allclose(fast[field], reference[field], rtol=0, atol=0.05, err_msg=field)
+    np.testing.assert_allclose(fast["control"], reference["control"], rtol=0, atol=1.0)
+
+    # The held power is what the stored P/I/D terms produce
+    terms = fast["p_term"].astype(np.float64) + fast["i_term"] + fast["d_term"]
+    control = np.clip(gains["kp"] * terms, gains["output_min"], gains["output_max"])
+    np.testing.assert_allclose(fast["control"], control, rtol=0, atol=0.1)
+
+
+def test_simulate_fast_without_ti_steps_every_stage():
+    # Settles within tolerance, but a P-only controller cannot hold h * (sp - ambient)
+    gains = dict(kp=10000.0, ti=0.0, td=0.0, output_min=-500.0, output_max=500.0)
+    reference = make_simulator(PIDController(**gains)).simulate(**FAST_PROTOCOL)
+    fast = make_simulator(PIDController(**gains)).simulate_fast(**FAST_PROTOCOL)
+
+    assert_results_equal(fast, reference)
+
+
+# Run in a subprocess, NUMBA_ENABLE_CUDASIM must be set before numba.cuda is imported
+_SWEEP_CHECK = """
+import numpy as np
+from test_pcr_simulator import PROTOCOL, assert_results_equal, make_simulator
+protocol = dict(PROTOCOL, num_cycles=1, final_duration=10)
+kp, ti = np.meshgrid([50.0, 92.0], [0.0, 4.1])
+sim = make_simulator()
+batch = sim.simulate_batch(kp, ti, 14.0, **protocol)
+assert_results_equal(sim.simulate_sweep_gpu(kp, ti, 14.0, **protocol), batch)
+# 4 runs on 2 blocks of 3 threads: the spare threads must not write
+assert_results_equal(sim.simulate_sweep_gpu(kp, ti, 14.0, **protocol, threads_per_block=3), batch)
+assert sim.simulate_sweep_gpu([], [], [], **protocol)["time"].shape[0] == 0
+"""
+
+
+def test_sweep_kernel_matches_batch_on_cuda_simulator():
+    pytest.importorskip("numba.cuda")
+    env = dict(os.environ, NUMBA_ENABLE_CUDASIM="1")
+    subprocess.run(
+        [sys.executable, "-c", _SWEEP_CHECK],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        check=True,
+    )
@@ -3,6 +3,8 @@ Advanced thermal model for PCR thermocycler simulation.
 Includes heating/cooling power limits, ambient heat loss, and configurable sample properties.
 """
 
+import math
+
 import numpy as np
 
 
@@ -61,6 +63,23 @@ class ThermalModel:
         # Note: heat_capacity parameter includes both, but we track sample separately
         self.total_heat_capacity = heat_capacity
     
+    def applied_power(self, control_output: float) -> float:
+        """
+        Limit the control signal to the available heating/cooling power.
+        
+        Args:
+            control_output: Control signal from PID controller (W)
+                           Positive = heating, Negative = cooling
+        
+        Returns:
+            Power actually delivered to the system (W)
+        """
+        if control_output > 0:
+            # Heating mode
+            return min(control_output, self.heating_power)
+        # Cooling mode (control_output is negative)
+        return max(control_output, -self.cooling_power)
+    
     def calculate_heat_flow(self, control_output: float) -> float:
         """
         Calculate net heat flow into the system.
@@ -73,12 +92,7 @@ class ThermalModel:
             Net heat flow (W) after applying power limits and ambient losses
         """
         # Apply power limits
-        if control_output > 0:
-            # Heating mode
-            applied_power = min(control_output, self.heating_power)
-        else:
-            # Cooling mode (control_output is negative)
-            applied_power = max(control_output, -self.cooling_power)
+        applied_power = self.applied_power(control_output)
         
         # Calculate ambient heat loss (always losing heat to ambient)
         # Positive when temp > ambient (heat loss), negative when temp < ambient (heat gain)
@@ -109,7 +123,13 @@ class ThermalModel:
     
     def update(self, control_output: float, dt: float) -> float:
         """
-        Update temperature using Euler integration.
+        Update temperature with the exact solution over one step.
+        
+        dT/dt = (P - h*(T - T_amb)) / C is linear in T, so for power P held
+        constant over the step:
+        T(t+dt) = T*e^(-h*dt/C) + (h*T_amb + P) * (1 - e^(-h*dt/C)) / h
+        (which tends to the Euler step T + P*dt/C for h -> 0). There is no
+        integration error, so accuracy does not limit the time step.
         
         Args:
             control_output: Control signal from PID controller (W)
@@ -118,8 +138,15 @@ class ThermalModel:
         Returns:
             New temperature (°C)
         """
-        dT_dt = self.get_derivative(control_output)
-        self.temperature += dT_dt * dt
+        applied_power = self.applied_power(control_output)
+        
+        h = self.heat_loss_coef
+        decay = math.exp(-h * dt / self.total_heat_capacity)
+        gain = (1.0 - decay) / h if h > 0 else dt / self.total_heat_capacity
+        self.temperature = (
+            self.temperature * decay
+            + (h * self.ambient_temp + applied_power) * gain
+        )
         
         return self.temperature
     